@@ -0,0 +1,95 @@
+"""
+HTTP client for the grocery APIs: one reused session, a polite delay between requests, and retries
+"""
+import asyncio
+import random
+import time
+from enum import StrEnum
+
+import backoff
+import curl_cffi
+
+from aldi.exceptions import FailedButRetrying, ScraperNeedsHumanIntervention
+from aldi.utilities import exp_collision_avoidance
+
+
+class StatusAction(StrEnum):
+    # backoff and try again
+    Retry = 'retry'
+    # we may have been blocked, don't keep hammering
+    NeedsHuman = 'human'
+
+
+# What to do on a non-200 response. 5xx is always retried (maybe the server will fix itself soon),
+# anything not covered probably needs looked at.
+STATUS_ACTIONS = {
+    429: StatusAction.Retry,
+    403: StatusAction.Retry,
+    **{code: StatusAction.NeedsHuman for code in (400, 401, 402, 404, 405, 406, 410)},
+}
+
+
+class RetryingClient:
+    def __init__(self, impersonate: str = "chrome", max_clients: int = 6):
+        # one session for the whole crawl, keeps the connection (and TLS session) alive between requests.
+        # HTTP/2 so concurrent requests (up to `max_clients`) share that one connection as multiplexed streams.
+        self._session = curl_cffi.requests.AsyncSession(
+            impersonate=impersonate,
+            max_clients=max_clients,
+            http_version=curl_cffi.CurlHttpVersion.V2TLS,
+        )
+        # Earliest time (monotonic) the next request may go out. Time already spent since the last request
+        # (parsing, writing, backoff waits) counts towards the polite delay instead of being added to it.
+        self._next_request_at = time.monotonic()
+        # only one request at a time gets to claim the next slot, keeps requests spaced out
+        # even with a page being prefetched
+        self._delay_lock = asyncio.Lock()
+
+
+    async def close(self):
+        await self._session.close()
+
+
+    async def __aenter__(self):
+        return self
+
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+    @backoff.on_exception(
+        wait_gen=exp_collision_avoidance,
+        exception=(curl_cffi.exceptions.HTTPError, FailedButRetrying),
+        max_time=4 * 60 * 60,
+        max_tries=15
+    )
+    async def get(self, url: str) -> curl_cffi.requests.models.Response:
+        async with self._delay_lock:
+            await asyncio.sleep(max(0.0, self._next_request_at - time.monotonic()))
+            self._next_request_at = time.monotonic() + random.uniform(7.2, 12.0)
+        print(f"GET {url}")
+        response = await self._session.get(url, headers={"Accept": "*/*"})
+
+        # Dispatch on the possible exceptions
+        if response.status_code != 200:
+            print(f"{response.status_code}")
+
+            if 500 <= response.status_code < 600:
+                raise FailedButRetrying()
+
+            match STATUS_ACTIONS.get(response.status_code):
+                case StatusAction.Retry:
+                    print(f'WARN: got {response.status_code}, backing off')
+                    raise FailedButRetrying()
+                case StatusAction.NeedsHuman:
+                    raise ScraperNeedsHumanIntervention(
+                        f"We may have been blocked... {response.status_code}"
+                    )
+                case _:
+                    raise ScraperNeedsHumanIntervention(
+                        f"Something happened :(, Unexpected status code {response.status_code}."
+                    )
+
+        print('ok')
+        return response
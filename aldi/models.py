@@ -1,116 +1,164 @@
-from pydantic import BaseModel
-from typing import Any, Self
+from pydantic import BaseModel, ConfigDict
+from typing import Any
+
+# Models are kept flat (module-level siblings, referenced by name) instead of nested inner classes,
+# so pydantic-core builds each schema once and shares it wherever it's referenced.
+
+class Price(BaseModel):
+    amount: int
+    amountRelevant: int
+    amountRelevantDisplay: str
+    bottleDeposit: int
+    bottleDepositDisplay: str
+    comparison: int
+    comparisonDisplay: Any
+    currencyCode: str
+    currencySymbol: str
+    perUnit: Any
+    perUnitDisplay: Any
+    wasPriceDisplay: Any
+    additionalInfo: Any
+    bottleDepositType: Any
+    feeText: Any
+
+
+class CountryExtensions(BaseModel):
+    usSnapEligible: bool
+
+
+class Category(BaseModel):
+    id: str
+    name: str
+    urlSlugText: str
+
+
+class Asset(BaseModel):
+    url: str
+    maxWidth: int
+    maxHeight: int
+    mimeType: str
+    assetType: str
+    alt: Any
+    displayName: Any
+
+
+class Datum(BaseModel):
+    sku: str
+    name: str
+    brandName: str
+    urlSlugText: str
+    ageRestriction: Any
+    alcohol: Any
+    discontinued: bool
+    discontinuedNote: Any
+    notForSale: bool
+    notForSaleReason: Any
+    quantityMin: int
+    quantityMax: int
+    quantityInterval: int
+    quantityDefault: int
+    quantityUnit: str
+    weightType: str
+    sellingSize: str
+    energyClass: Any
+    onSaleDateDisplay: Any
+    price: Price
+    countryExtensions: CountryExtensions
+    categories: list[Category]
+    assets: list[Asset]
+    badges: list[Any]
+
+
+class Pagination(BaseModel):
+    offset: int
+    limit: int
+    totalCount: int
+
+
+class FacetConfigComponent(BaseModel):
+    name: str
+    valueActive: str | None
+    valueInactive: str | None
+
+
+class FacetConfig(BaseModel):
+    parameterName: str
+    type: str
+    isMultiValue: bool
+    componentName: str
+    component: FacetConfigComponent
+
+
+class FacetValue(BaseModel):
+    key: str
+    docCount: int
+    label: str
+    isSelected: bool | None
+    thumbnail: Any
+    children: list["FacetValue"]
+
+
+FacetValue.model_rebuild()
 
-class SearchAPIResponse(BaseModel):
-    class Datum(BaseModel):
-        class Price(BaseModel):
-            amount: int
-            amountRelevant: int
-            amountRelevantDisplay: str
-            bottleDeposit: int
-            bottleDepositDisplay: str
-            comparison: int
-            comparisonDisplay: Any
-            currencyCode: str
-            currencySymbol: str
-            perUnit: Any
-            perUnitDisplay: Any
-            wasPriceDisplay: Any
-            additionalInfo: Any
-            bottleDepositType: Any
-            feeText: Any
-
-        class CountryExtensions(BaseModel):
-            usSnapEligible: bool
-
-        class Category(BaseModel):
-            id: str
-            name: str
-            urlSlugText: str
-
-        class Asset(BaseModel):
-            url: str
-            maxWidth: int
-            maxHeight: int
-            mimeType: str
-            assetType: str
-            alt: Any
-            displayName: Any
-
-        sku: str
-        name: str
-        brandName: str
-        urlSlugText: str
-        ageRestriction: Any
-        alcohol: Any
-        discontinued: bool
-        discontinuedNote: Any
-        notForSale: bool
-        notForSaleReason: Any
-        quantityMin: int
-        quantityMax: int
-        quantityInterval: int
-        quantityDefault: int
-        quantityUnit: str
-        weightType: str
-        sellingSize: str
-        energyClass: Any
-        onSaleDateDisplay: Any
-        price: Price
-        countryExtensions: CountryExtensions
-        categories: list[Category]
-        assets: list[Asset]
-        badges: list[Any]
-
-
-    class Meta(BaseModel):
-        class Pagination(BaseModel):
-            offset: int
-            limit: int
-            totalCount: int
-
-        class Facet(BaseModel):
-            class Config(BaseModel):
-                class Component(BaseModel):
-                    name: str
-                    valueActive: str | None
-                    valueInactive: str | None
-
-                parameterName: str
-                type: str
-                isMultiValue: bool
-                componentName: str
-                component: Component
-
-            class Value(BaseModel):
-                key: str
-                docCount: int
-                label: str
-                isSelected: bool | None
-                thumbnail: Any
-                children: list[Self]
-
-            name: str
-            localizedName: str
-            docCount: int
-            activeValue: list[Any]
-            config: Config
-            stats: Any
-            values: list[Value]
-
-        class SortItem(BaseModel):
-            parameterName: str
-            parameterValue: str
-            localizedName: str
-            isActive: bool
-
-        spellingSuggestion: Any
-        pinned: list[Any]
-        keywordRedirect: Any
-        pagination: Pagination
-        debug: Any
-        facets: list[Facet]
-        sort: list[SortItem]
 
+class Facet(BaseModel):
+    name: str
+    localizedName: str
+    docCount: int
+    activeValue: list[Any]
+    config: FacetConfig
+    stats: Any
+    values: list[FacetValue]
+
+
+class SortItem(BaseModel):
+    parameterName: str
+    parameterValue: str
+    localizedName: str
+    isActive: bool
+
+
+class Meta(BaseModel):
+    spellingSuggestion: Any
+    pinned: list[Any]
+    keywordRedirect: Any
+    pagination: Pagination
+    debug: Any
+    facets: list[Facet]
+    sort: list[SortItem]
+
+
+class SearchAPIResponse(BaseModel):
     meta: Meta
-    data: list[Datum]
\ No newline at end of file
+    data: list[Datum]
+
+
+# Partial views of the search API response. Anything not declared here is ignored, so the
+# large `data` array is skipped and only the parts we actually read have to keep their shape.
+class FacetsMeta(BaseModel):
+    pagination: Pagination
+    facets: list[Facet]
+
+
+class FacetsOnly(BaseModel):
+    meta: FacetsMeta
+
+
+class PaginationMeta(BaseModel):
+    pagination: Pagination
+
+
+class PaginationOnly(BaseModel):
+    meta: PaginationMeta
+
+
+# Just the SKUs off a page of results, the rest of each product is skipped rather than validated
+class SlimDatum(BaseModel):
+    model_config = ConfigDict(extra='ignore', frozen=True)
+
+    sku: str
+
+
+class SkusOnly(BaseModel):
+    meta: PaginationMeta
+    data: list[SlimDatum]
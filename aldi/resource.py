@@ -1,23 +1,26 @@
 """
 Give a clean sane API over the grocery search API
 """
+import asyncio
+import functools
 import itertools
-import json
 import random
 import time
-from dataclasses import dataclass
+from collections import deque
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from enum import StrEnum
-from typing import Any, NamedTuple, Callable, Generator, reveal_type
-from urllib.parse import quote
+from types import MappingProxyType
+from typing import AsyncGenerator, Mapping, NamedTuple, Callable, reveal_type
+from urllib.parse import quote, urlencode
 
-import backoff
-import curl_cffi
 import pydantic
 
-from aldi.models import SearchAPIResponse
-from aldi.exceptions import FailedButRetrying, ScraperNeedsHumanIntervention
-from aldi.utilities import exp_collision_avoidance, perturb
+# Reuse data models from API response
+from aldi.models import Facet, FacetValue, FacetsOnly, PaginationOnly, SkusOnly
+from aldi.exceptions import ScraperNeedsHumanIntervention
+from aldi.http import RetryingClient
+from aldi.utilities import perturb
 
 # TODO: pull this from the API directly, no hardcode
 class SortBy(StrEnum):
@@ -34,11 +37,36 @@ SORTBY_DUALS = {
     SortBy.PriceLowToHigh: SortBy.PriceHighToLow,
     SortBy.PriceHighToLow: SortBy.PriceLowToHigh,
 }
-
-
-# Reuse data models from API response
-type Facet = SearchAPIResponse.Meta.Facet
-type FacetValue = SearchAPIResponse.Meta.Facet.Value
+SORTBY_DUAL_CHOICES = tuple(SORTBY_DUALS.keys())
+
+# How likely a typical person browsing is to pick each sortby
+SORTBY_BROWSING = {
+    # These two are pretty likely most of the time for typical person browsing
+    SortBy.Relevance: 0.7,
+    SortBy.PriceLowToHigh: 0.2,
+    # These... not so much
+    SortBy.PriceHighToLow: 0.033,
+    SortBy.AToZ: 0.033,
+    SortBy.ZToA: 0.033
+}
+SORTBY_BROWSING_CHOICES = tuple(SORTBY_BROWSING.keys())
+SORTBY_BROWSING_WEIGHTS = tuple(SORTBY_BROWSING.values())
+
+# Query parameters in the order the webapp uses
+PARAMS_ORDER = [
+    'currency',
+    'serviceType',
+    'q',
+    'limit',
+    'offset',
+    'brandName',
+    'categoryTree',
+    'usaSnapEligible',
+    'sort',
+    'testVariant',
+    'servicePoint',
+]
+PARAMS_ORDER_INDEX = {name: i for i, name in enumerate(PARAMS_ORDER)}
 
 
 @dataclass
@@ -60,10 +88,14 @@ class FacetFlat:
 
 
 def flatten_facet_value(facet_value: FacetValue) -> list[FacetValue]:
-    ret = [facet_value]
+    ret: list[FacetValue] = []
 
-    for child in facet_value.children:
-        ret += flatten_facet_value(child)
+    # depth-first with an explicit stack, same order as walking the tree recursively (parent, then children in order)
+    stack = [facet_value]
+    while stack:
+        value = stack.pop()
+        ret.append(value)
+        stack.extend(reversed(value.children))
 
     return ret
 
@@ -71,10 +103,6 @@ def flatten_facet_value(facet_value: FacetValue) -> list[FacetValue]:
 def flatten_facet(facet: Facet) -> list[FacetFlat]:
     key = facet.config.parameterName
 
-    all_values: list[FacetValue] = []
-    for value in facet.values:
-        all_values += flatten_facet_value(value)
-
     return [
         FacetFlat(
             key=key,
@@ -82,7 +110,7 @@ def flatten_facet(facet: Facet) -> list[FacetFlat]:
             n_items=value.docCount,
             children={child.key for child in value.children}
         )
-        for value in all_values
+        for value in itertools.chain.from_iterable(flatten_facet_value(v) for v in facet.values)
     ]
 
 
@@ -98,7 +126,8 @@ class ClassifiedFacets(NamedTuple):
 @dataclass
 class PageCrawlResult:
     skus: set[str]
-    response_data: dict[str, Any]
+    # raw response body, exactly as the server sent it
+    response_content: bytes
     response_time: datetime
 
 
@@ -114,93 +143,47 @@ class GrocerySearchAPI:
     # max number of items to request in a page
     # TODO: this can be automatically pulled from .meta.pagination.limit
     items_per_page: int = 60
+    # max number of pages in flight/queued ahead of the consumer, same as a browser's per-host limit
+    max_pages_ahead: int = 6
+    # seconds a store's facets are reused for before being fetched again
+    facet_cache_ttl: float = 6 * 60 * 60
 
-    @staticmethod
-    @backoff.on_exception(
-        wait_gen=exp_collision_avoidance,
-        exception=(curl_cffi.exceptions.HTTPError, FailedButRetrying),
-        max_time=4 * 60 * 60,
-        max_tries=15
-    )
-    def _get(url: str) -> curl_cffi.requests.models.Response:
-        print(f"GET {url}")
-        time.sleep(random.randrange(7200, 12000) / 1000)
-        response = curl_cffi.get(url, impersonate="chrome", headers={"Accept": "*/*"})
-
-        # Dispatch on the possible exceptions
-        if response.status_code != 200:
-            print(f"{response.status_code}")
-            # backoff
-            if response.status_code == 429:
-                raise FailedButRetrying()
-
-            # 5xx -> backoff, maybe the server will fix itself soon
-            if 500 <= response.status_code < 600:
-                raise FailedButRetrying()
-
-            if response.status_code in {400, 401, 402, 404, 405, 406, 410}:
-                raise ScraperNeedsHumanIntervention(
-                    f"We may have been blocked... {response.status_code}"
-                )
+    # reused HTTP session, handles the polite delay between requests and retries
+    _client: RetryingClient = field(init=False, repr=False)
+    # (region_id, store_id) -> (time.monotonic() when fetched, facets)
+    _facet_cache: dict[tuple[int, int], tuple[float, list[Facet]]] = field(init=False, repr=False, default_factory=dict)
 
-            if response.status_code == 403:
-                print('WARN: got 403, backing off')
-                raise FailedButRetrying()
+    def __post_init__(self):
+        self._client = RetryingClient(impersonate="chrome", max_clients=self.max_pages_ahead)
+
+
+    async def close(self):
+        await self._client.close()
+
+
+    async def __aenter__(self):
+        return self
 
-            # Everything not covered probably needs looked at
-            raise ScraperNeedsHumanIntervention(
-                f"Something happened :(, Unexpected status code {response.status_code}."
-            )
 
-        print('ok')
-        return response
-
-
-    def _build_url(self, parameters: dict[str, str]):
-        # match the order the webapp uses
-        params_order = [
-            'currency',
-            'serviceType',
-            'q',
-            'limit',
-            'offset',
-            'brandName',
-            'categoryTree',
-            'usaSnapEligible',
-            'sort',
-            'testVariant',
-            'servicePoint',
-        ]
-
-        params_known = set(params_order)
-
-        params_used = set(parameters.keys())
-        params_used_known = params_used & params_known
-        params_used_unknown = params_used - params_known
-
-        params_ordered: list[tuple[str, str]] = []
-
-        # add known-order parameters first
-        for param_key in params_order:
-            if param_key in params_used_known:
-                params_ordered.append((param_key, parameters[param_key]))
-
-        # add unknown-order parameters last
-        for param_key in params_used_unknown:
-            params_ordered.append((param_key, parameters[param_key]))
-
-        # create query string
-        query_str: str = ''
-        if len(params_ordered) > 0:
-            query_str = '?'
-            for key, value in params_ordered:
-                if len(key) > 0:
-                    query_str += quote(key, encoding=None, errors=None)
-                    query_str += '='
-                    query_str += quote(value, encoding=None, errors=None)
-                    query_str += '&'
-
-        query_str = query_str.strip('&')
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+    def _build_url(self, parameters: Mapping[str, str]):
+        # known-order parameters first, unknown-order parameters last (sort is stable, so those keep their order)
+        params_ordered: list[tuple[str, str]] = sorted(
+            parameters.items(),
+            key=lambda kv: PARAMS_ORDER_INDEX.get(kv[0], len(PARAMS_ORDER))
+        )
+
+        # create query string, skipping nameless parameters (e.g. from the null facet)
+        query_str: str = urlencode(
+            [(key, value) for key, value in params_ordered if len(key) > 0],
+            safe='/',
+            quote_via=quote,
+        )
+        if len(query_str) > 0:
+            query_str = '?' + query_str
 
         # with that out of the way...
         return f'https://{self.api_hostname}{self.api_path}{query_str}'
@@ -211,19 +194,27 @@ class GrocerySearchAPI:
         return f'{region_id:03}-{store_id:03}'
 
 
-    def _crawl_results(
+    # Parameters every search for a store starts from, built once per store. Read-only since it's shared,
+    # copy it to add to it.
+    @staticmethod
+    @functools.lru_cache(maxsize=32)
+    def _base_params(region_id: int, store_id: int) -> Mapping[str, str]:
+        return MappingProxyType({
+            'currency': 'USD',
+            'testVariant': 'A',
+            'servicePoint': GrocerySearchAPI._format_service_point(region_id, store_id),
+            'q': '',
+        })
+
+
+    async def _crawl_results(
         self,
         region_id: int,
         store_id: int,
         sort_by: SortBy = SortBy.Relevance,
         additional_parameters: dict[str, str] | None = None
-    ) -> Generator[PageCrawlResult]:
-        params = {
-            'currency': 'USD',
-            'testVariant': 'A',
-            'servicePoint': f'{region_id:03}-{store_id:03}',
-            'q': '',
-        }
+    ) -> AsyncGenerator[PageCrawlResult]:
+        params = dict(self._base_params(region_id, store_id))
 
         if sort_by != SortBy.Relevance:
             params['sort'] = str(sort_by)
@@ -247,13 +238,15 @@ class GrocerySearchAPI:
 
             return past_reachable or past_end
 
-        while not is_done_paging(current_index, end_index, self.items_per_page, self.max_page_items):
-            params_this_page = params.copy()
-            params_this_page['limit'] = str(self.items_per_page)
-            params_this_page['offset'] = str(min(current_index, self.max_page_items))
+        # Fetches one page, returns the total count it reported alongside it
+        async def crawl_page(current_index: int) -> tuple[int, PageCrawlResult]:
+            params_this_page = params | {
+                'limit': str(self.items_per_page),
+                'offset': str(min(current_index, self.max_page_items)),
+            }
 
             this_page_url = self._build_url(params_this_page)
-            response = self._get(this_page_url)
+            response = await self._client.get(this_page_url)
             response_time = datetime.now(timezone.utc)
 
             # Check for JSON
@@ -262,47 +255,82 @@ class GrocerySearchAPI:
                     f"Did not get json, got {response.headers.get('content-type')} instead."
                 )
 
-            # Try to parse JSON response
-            response_data: dict[str, Any] = {}
+            # Parse and validate in one pass, only the SKUs and total count are read off the page.
+            # Everything else is ignored (the page is stored raw), so schema changes elsewhere don't stop the crawl.
             try:
-                response_data = json.loads(response.text)
-            except json.JSONDecodeError:
-                raise ScraperNeedsHumanIntervention(
-                    f"Endpoint sent back JSON, but it wasn't JSON...\n{response.text}"
-                )
+                response_data = SkusOnly.model_validate_json(response.content)
+            except pydantic.ValidationError as e:
+                raise ScraperNeedsHumanIntervention(f"Response body data model for pages changed, unable to continue ('{e}')")
 
-            page_count_reported = int(response_data["meta"]["pagination"]["totalCount"])
-            if end_index is None:
-                end_index = page_count_reported
+            page_count_reported = response_data.meta.pagination.totalCount
 
             # pull out SKUs
-            skus = {data['sku'] for data in response_data['data']}
+            skus = {data.sku for data in response_data.data}
 
-            yield PageCrawlResult(
+            return page_count_reported, PageCrawlResult(
                 skus=skus,
-                response_data=response_data,
+                response_content=response.content,
                 response_time=response_time
             )
 
-            #write_json_zstd(js, job_data_path / f'{response_time.isoformat()}.json.zst')
+        # Pages being fetched ahead of the consumer, in offset order. Once a page reports the total count, every
+        # remaining offset is known, so those requests can be queued up and multiplexed over the one connection.
+        # They still go out one polite delay apart, this only stops them from waiting on the consumer too.
+        pending: deque[asyncio.Task[tuple[int, PageCrawlResult]]] = deque()
+        # next offset that hasn't been queued yet
+        queued_index = current_index
+        try:
+            while not is_done_paging(current_index, end_index, self.items_per_page, self.max_page_items):
+                if not pending:
+                    pending.append(asyncio.create_task(crawl_page(current_index)))
+                    queued_index = current_index + self.items_per_page
 
-            # Restart if the external products db updated while we were paging
-            if page_count_reported != end_index:
-                end_index = None
-                continue
+                page_count_reported, page = await pending.popleft()
 
-            current_index += self.items_per_page
+                if end_index is None:
+                    end_index = page_count_reported
 
+                next_index = current_index + self.items_per_page
 
-    def _get_all_facets(self, region_id: int, store_id: int) -> list[Facet]:
-        url = self._build_url({
-            'currency': 'USD',
-            'testVariant': 'A',
-            'servicePoint': f'{region_id:03}-{store_id:03}',
-            'q': ''
-        })
+                # Restart if the external products db updated while we were paging
+                if page_count_reported != end_index:
+                    end_index = None
+                    next_index = current_index
+
+                    for task in pending:
+                        task.cancel()
+                    pending.clear()
+                    queued_index = next_index
+
+                # without a known end, only look one page ahead
+                max_ahead = self.max_pages_ahead if end_index is not None else 1
+                while (
+                    len(pending) < max_ahead
+                    and not is_done_paging(queued_index, end_index, self.items_per_page, self.max_page_items)
+                ):
+                    pending.append(asyncio.create_task(crawl_page(queued_index)))
+                    queued_index += self.items_per_page
+
+                yield page
 
-        response = self._get(url)
+                current_index = next_index
+        finally:
+            # consumer stopped early, don't leave requests behind
+            for task in pending:
+                task.cancel()
+
+
+    async def _get_all_facets(self, region_id: int, store_id: int) -> list[Facet]:
+        # Facets change much slower than prices, reuse a recent copy for this store if there is one
+        cached = self._facet_cache.get((region_id, store_id))
+        if cached is not None:
+            fetched_at, facets = cached
+            if time.monotonic() - fetched_at < self.facet_cache_ttl:
+                return facets
+
+        url = self._build_url(self._base_params(region_id, store_id))
+
+        response = await self._client.get(url)
 
         # Check for JSON
         if response.headers.get("content-type") != "application/json":
@@ -310,35 +338,20 @@ class GrocerySearchAPI:
                 f"Did not get json, got {response.headers.get('content-type')} instead."
             )
 
-        # Try to parse JSON response
-        # TODO: partial Pydantic validate here. Allow anything outside of .meta.facets to have changed.
-        response_data: dict[str, Any] = {}
-        try:
-            response_data = json.loads(response.text)
-        except json.JSONDecodeError:
-            raise ScraperNeedsHumanIntervention(
-                f"Endpoint sent back JSON, but it wasn't JSON...\n{response.text}"
-            )
-
-        # Try to model validate the facets
+        # Parse and validate in one pass, only .meta.pagination and .meta.facets need to keep their shape
         try:
-            return [
-                SearchAPIResponse.Meta.Facet.model_validate(facet)
-                for facet in response_data['meta']['facets']
-            ]
+            facets = FacetsOnly.model_validate_json(response.content).meta.facets
         except pydantic.ValidationError as e:
             raise ScraperNeedsHumanIntervention(f"Response body data model for facets changed, unable to continue ('{e}')")
 
+        self._facet_cache[(region_id, store_id)] = (time.monotonic(), facets)
+        return facets
 
-    def get_total_number_of_products(self, region_id: int, store_id: int) -> int:
-        url = self._build_url({
-            'currency': 'USD',
-            'testVariant': 'A',
-            'servicePoint': f'{region_id:03}-{store_id:03}',
-            'q': ''
-        })
 
-        response = self._get(url)
+    async def get_total_number_of_products(self, region_id: int, store_id: int) -> int:
+        url = self._build_url(self._base_params(region_id, store_id))
+
+        response = await self._client.get(url)
 
         # Check for JSON
         if response.headers.get("content-type") != "application/json":
@@ -346,23 +359,17 @@ class GrocerySearchAPI:
                 f"Did not get json, got {response.headers.get('content-type')} instead."
             )
 
-        # Try to parse JSON response
-        # TODO: partial Pydantic validate here. Allow anything outside of .meta.pagination to have changed.
-        response_data: dict[str, Any] = {}
+        # Parse and validate in one pass, anything outside of .meta.pagination is allowed to have changed
         try:
-            response_data = json.loads(response.text)
-        except json.JSONDecodeError:
-            raise ScraperNeedsHumanIntervention(
-                f"Endpoint sent back JSON, but it wasn't JSON...\n{response.text}"
-            )
-
-        return int(response_data["meta"]["pagination"]["totalCount"])
+            return PaginationOnly.model_validate_json(response.content).meta.pagination.totalCount
+        except pydantic.ValidationError as e:
+            raise ScraperNeedsHumanIntervention(f"Response body data model for pagination changed, unable to continue ('{e}')")
 
 
-    def crawl_store(self, region_id: int, store_id: int) -> Generator[PageCrawlResult]:
+    async def crawl_store(self, region_id: int, store_id: int) -> AsyncGenerator[PageCrawlResult]:
         # First, get the number of products at this store
         print('Getting initial number of products')
-        n_products = self.get_total_number_of_products(region_id, store_id)
+        n_products = await self.get_total_number_of_products(region_id, store_id)
         print(f'{n_products=}')
 
         # `max_page_items` limits us to page through that many items.
@@ -373,7 +380,7 @@ class GrocerySearchAPI:
             if n_products <= self.max_page_items:
                 print('Possible to do this without dual mode...')
                 # Straight-through mode
-                for page in self._crawl_results(region_id, store_id):
+                async for page in self._crawl_results(region_id, store_id):
                     yield page
             else:
                 print('Doing dual mode...')
@@ -382,51 +389,43 @@ class GrocerySearchAPI:
                 # we'll stop crawling as soon as `n_products` is hit
                 skus_seen: set[str] = set()
 
-                sort_by = random.choice(list(SORTBY_DUALS.keys()))
+                sort_by = random.choice(SORTBY_DUAL_CHOICES)
                 print(f'First sortby {sort_by}')
-                for page in self._crawl_results(region_id, store_id, sort_by):
-                    skus_seen.update(page.skus)
-                    print(f"Yielded {len(page.skus)}, at {len(skus_seen)} and want {n_products}")
+                async for page in self._crawl_results(region_id, store_id, sort_by):
+                    new_skus = page.skus - skus_seen
+                    skus_seen |= new_skus
+                    print(f"Yielded {len(page.skus)} ({len(new_skus)} new), at {len(skus_seen)} and want {n_products}")
+
+                    yield page
 
+                    # This page finished it off, stop before another page gets fetched
                     if len(skus_seen) >= n_products:
                         return
 
-                    yield page
-
                 inverse_sort_by = SORTBY_DUALS[sort_by]
                 print(f'Second sortby {inverse_sort_by}')
-                for page in self._crawl_results(region_id, store_id, inverse_sort_by):
-                    skus_seen.update(page.skus)
-                    print(f"Yielded {len(page.skus)}, at {len(skus_seen)} and want {n_products}")
+                async for page in self._crawl_results(region_id, store_id, inverse_sort_by):
+                    new_skus = page.skus - skus_seen
+                    skus_seen |= new_skus
+                    print(f"Yielded {len(page.skus)} ({len(new_skus)} new), at {len(skus_seen)} and want {n_products}")
+
+                    yield page
 
+                    # This page finished it off, stop before another page gets fetched
                     if len(skus_seen) >= n_products:
                         return
 
-                    yield page
-
         else:
             print('Advanced mode')
             # Requires generating a more advanced crawling strategy
             # Get potential filters
-            facets: list[Facet] = self._get_all_facets(region_id, store_id)
+            facets: list[Facet] = await self._get_all_facets(region_id, store_id)
 
             # Flatten the facets into one big list
             all_possible_filters: list[FacetFlat] = list(itertools.chain.from_iterable([
                 flatten_facet(facet) for facet in facets
             ]))
 
-            # Rank filters
-            # Ones more than what we can page through are deprioritized, but not removed/filtered- they're still useful
-            def ranker(ff: FacetFlat):
-                max_reachable = 2*self.max_page_items
-                return ff.n_items
-                if ff.n_items >= max_reachable:
-                    n_unreachable = ff.n_items - max_reachable
-                    # penalize a bit because of the unreachability
-                    return ff.n_items - 2*n_unreachable
-                else:
-                    return ff.n_items
-
             # Null facet is no filters, e.g. return everything
             null_facet = FacetFlat(
                 key='',
@@ -436,7 +435,8 @@ class GrocerySearchAPI:
             )
             all_possible_filters.append(null_facet)
 
-            all_possible_filters = sorted(all_possible_filters, key=ranker)[::-1]
+            # Rank filters, biggest first. Ones with more than what we can page through are kept, they're still useful
+            all_possible_filters.sort(key=lambda ff: ff.n_items, reverse=True)
 
             # perturb the list a bit to further make runs less consistent
             all_possible_filters = perturb(all_possible_filters, radius=2, prob=0.3)
@@ -460,54 +460,50 @@ class GrocerySearchAPI:
 
                     if dual_mode_necessary:
                         print('Requires dual mode')
-                        sort_by = random.choice(list(SORTBY_DUALS.keys()))
-                        for page in self._crawl_results(region_id, store_id, sort_by, {flter.key: flter.value}):
-                            skus_seen.update(page.skus)
-                            print(f"Yielded {len(page.skus)}, at {len(skus_seen)} and want {n_products}")
+                        sort_by = random.choice(SORTBY_DUAL_CHOICES)
+                        async for page in self._crawl_results(region_id, store_id, sort_by, {flter.key: flter.value}):
+                            new_skus = page.skus - skus_seen
+                            skus_seen |= new_skus
+                            print(f"Yielded {len(page.skus)} ({len(new_skus)} new), at {len(skus_seen)} and want {n_products}")
+
+                            yield page
 
+                            # This page finished it off, stop before another page gets fetched
                             if len(skus_seen) >= n_products:
                                 return
 
-                            yield page
-
                         inverse_sort_by = SORTBY_DUALS[sort_by]
-                        for page in self._crawl_results(region_id, store_id, inverse_sort_by, {flter.key: flter.value}):
-                            skus_seen.update(page.skus)
-                            print(f"Yielded {len(page.skus)}, at {len(skus_seen)} and want {n_products}")
+                        async for page in self._crawl_results(region_id, store_id, inverse_sort_by, {flter.key: flter.value}):
+                            new_skus = page.skus - skus_seen
+                            skus_seen |= new_skus
+                            print(f"Yielded {len(page.skus)} ({len(new_skus)} new), at {len(skus_seen)} and want {n_products}")
 
+                            yield page
+
+                            # This page finished it off, stop before another page gets fetched
                             if len(skus_seen) >= n_products:
                                 return
 
-                            yield page
-
                     else:
                         print('no dual mode')
-                        weights = {
-                            # These two are pretty likely most of the time for typical person browsing
-                            SortBy.Relevance: 0.7,
-                            SortBy.PriceLowToHigh: 0.2,
-                            # These... not so much
-                            SortBy.PriceHighToLow: 0.033,
-                            SortBy.AToZ: 0.033,
-                            SortBy.ZToA: 0.033
-                        }
-
                         sort_by = random.choices(
-                            population=list(weights.keys()),
-                            weights=list(weights.values()),
+                            population=SORTBY_BROWSING_CHOICES,
+                            weights=SORTBY_BROWSING_WEIGHTS,
                             k=1
-                        )
+                        )[0]
                         print(f'Sorting by {sort_by}')
 
-                        for page in self._crawl_results(region_id, store_id, sort_by[0], {flter.key: flter.value}):
-                            skus_seen.update(page.skus)
-                            print(f"Yielded {len(page.skus)}, at {len(skus_seen)} and want {n_products}")
+                        async for page in self._crawl_results(region_id, store_id, sort_by, {flter.key: flter.value}):
+                            new_skus = page.skus - skus_seen
+                            skus_seen |= new_skus
+                            print(f"Yielded {len(page.skus)} ({len(new_skus)} new), at {len(skus_seen)} and want {n_products}")
 
+                            yield page
+
+                            # This page finished it off, stop before another page gets fetched
                             if len(skus_seen) >= n_products:
                                 return
 
-                            yield page
-
                 # update exhausted
                 filters_exhausted.add(flter.id())
                 filters_exhausted.update(flter.children)
@@ -4,20 +4,16 @@ from typing import Any, Sequence, TypeVar
 
 def exp_collision_avoidance(
         step_ms=1.5,
+        max_exponent=20,
 ) -> Generator[float, Any, None]:
     # Ignore first call
-    print('wait 0')
     yield 0
 
     c: int = 0
     while True:
-        k = random.randint(0, 2**c)
-
-        wait_ms = k * step_ms
-        wait_s = wait_ms / 1000
-        print(f"wait {wait_s=}")
-
-        yield wait_s
+        # uniform over [0, 2**c) steps, exponent capped so it stays small-int float math
+        wait_ms = random.random() * (1 << min(c, max_exponent)) * step_ms
+        yield wait_ms / 1000
 
         c += 1
 
@@ -27,16 +23,18 @@ def perturb(ls: list[T], radius=2, prob=0.22) -> list[T]:
     # copy
     ls_local = ls[:]
 
-    for i in range(n):
-        if random.random() < prob:
-            # random index from `i` clamped to bounds of list
-            j = random.randint(
-                max(0, i - radius),
-                min(n - 1, i + radius)
-            )
-
-            # swap
-            ls_local[i], ls_local[j] = ls_local[j], ls_local[i]
+    # Same as rolling `prob` for every index, but with one draw for how many indices get swapped
+    # and one for which ones, instead of a draw per index
+    n_swaps = random.binomialvariate(n, prob)
+    for i in sorted(random.sample(range(n), n_swaps)):
+        # random index from `i` clamped to bounds of list
+        j = random.randint(
+            max(0, i - radius),
+            min(n - 1, i + radius)
+        )
+
+        # swap
+        ls_local[i], ls_local[j] = ls_local[j], ls_local[i]
 
     return ls_local
 
@@ -2,22 +2,97 @@
 Pulls down raw grocery data for later analysis
 """
 
+import asyncio
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
 from uuid import uuid4
-import json
 
+import pydantic_core
 import pyzstd  # TODO(3.14): Add zstd, currently we're on 3.13 but 3.14 hits soon once curl-cffi moves up
 
 from aldi.resource import GrocerySearchAPI
 
-def write_json_zstd(data: dict[str, Any], path: Path):
-    with open(path, "wb") as f:
-        as_str = json.dumps(data, separators=(",", ":"), sort_keys=True)
-        as_bytes = as_str.encode("utf-8")
-        as_compressed_str = pyzstd.compress(as_bytes, 10)
-        f.write(as_compressed_str)
+# Default zstd level. Pages are many small, similar JSON blobs, higher levels cost a lot more CPU for
+# barely any size win.
+ZSTD_LEVEL = 3
+
+# When asked to use a zstd dictionary that doesn't exist yet, one is trained off this many pages
+DICT_TRAINING_PAGES = 20
+DICT_SIZE = 64 * 1024
+# Name of the dictionary copy kept in each job's directory, needed to decompress its files
+JOB_DICT_NAME = "zstd.dict"
+
+
+class ZstdWriter:
+    def __init__(self, level: int = ZSTD_LEVEL, zstd_dict: pyzstd.ZstdDict | None = None):
+        self.level = level
+        self.use_dict(zstd_dict)
+
+
+    def use_dict(self, zstd_dict: pyzstd.ZstdDict | None):
+        self.zstd_dict = zstd_dict
+        # one compression context reused for every file, instead of a fresh one per write
+        self._compressor = pyzstd.ZstdCompressor(self.level, zstd_dict)
+
+
+    def write(self, data: bytes, path: Path):
+        # every file is its own complete frame
+        compressed = memoryview(self._compressor.compress(data, pyzstd.ZstdCompressor.FLUSH_FRAME))
+        # unbuffered, it's one write of an already complete frame so there's nothing to gain from copying
+        # it through a buffer first. Raw writes can be short, keep going until it's all out.
+        with open(path, "wb", buffering=0) as f:
+            while compressed:
+                compressed = compressed[f.write(compressed):]
+
+
+    def write_json(self, data: dict[str, Any], path: Path):
+        # straight to compact JSON bytes, no intermediate str
+        self.write(pydantic_core.to_json(data), path)
+
+
+def train_zstd_dict(samples: list[bytes], path: Path) -> pyzstd.ZstdDict | None:
+    try:
+        zstd_dict = pyzstd.train_dict(samples, DICT_SIZE)
+    except pyzstd.ZstdError as e:
+        print(f'WARN: unable to train a zstd dictionary, continuing without one ({e})')
+        return None
+
+    path.write_bytes(zstd_dict.dict_content)
+    print(f'Trained zstd dictionary {zstd_dict.dict_id}, saved to {path}')
+    return zstd_dict
+
+
+async def crawl_to_disk(
+    api_host: str,
+    api_root: str,
+    region: int,
+    store: int,
+    job_data_path: Path,
+    writer: ZstdWriter,
+    train_dict_path: Path | None = None,
+):
+    # first pages of the run, to train a dictionary on and save to `train_dict_path`
+    samples: list[bytes] = []
+
+    # Compressing and writing happen in a worker thread so the event loop stays free: the crawler keeps
+    # fetching its queued pages ahead (bounded by `max_pages_ahead`) while the current one is written.
+    async with GrocerySearchAPI(api_host, api_root) as api:
+        async for page in api.crawl_store(region, store):
+            await asyncio.to_thread(
+                writer.write, page.response_content, job_data_path / f'{page.response_time.isoformat()}.json.zst'
+            )
+
+            if train_dict_path is not None:
+                samples.append(page.response_content)
+                if len(samples) >= DICT_TRAINING_PAGES:
+                    writer.use_dict(await asyncio.to_thread(train_zstd_dict, samples, train_dict_path))
+                    if writer.zstd_dict is not None:
+                        # keep a copy with the job, its later files can't be decompressed without it
+                        (job_data_path / JOB_DICT_NAME).write_bytes(writer.zstd_dict.dict_content)
+                    # train once per run, whether that worked or not
+                    train_dict_path = None
+                    samples = []
 
 
 if __name__ == "__main__":
@@ -50,6 +125,15 @@ if __name__ == "__main__":
     _ = parser.add_argument(
         "-R", "--api-root", type=str, required=True, help="Search API path"
     )
+
+    _ = parser.add_argument(
+        "-z", "--zstd-level", type=int, default=ZSTD_LEVEL, help=f"zstd compression level (default {ZSTD_LEVEL})"
+    )
+    # Pages all share the same structure, so a trained dictionary compresses them a lot better.
+    # Reused across runs, trained off the first pages of this run if it doesn't exist yet.
+    _ = parser.add_argument(
+        "-D", "--zstd-dict", type=str, default=None, help="zstd dictionary path (trained if missing)"
+    )
     args = parser.parse_args()
 
     # Shut pyright up
@@ -58,8 +142,8 @@ if __name__ == "__main__":
     assert isinstance(args.output_path, str)
     assert isinstance(args.api_host, str)
     assert isinstance(args.api_root, str)
-
-    api = GrocerySearchAPI(args.api_host, args.api_root)
+    assert isinstance(args.zstd_level, int)
+    assert args.zstd_dict is None or isinstance(args.zstd_dict, str)
 
     this_job_id = str(uuid4())
     scrape_start = datetime.now(timezone.utc)
@@ -73,7 +157,21 @@ if __name__ == "__main__":
     job_data_path = Path(args.output_path) / this_job_id[0:2] / this_job_id[2:4] / this_job_id
     job_data_path.mkdir(parents=True, exist_ok=True)
 
-    write_json_zstd(scrape_meta, job_data_path / "meta.json.zst")
+    writer = ZstdWriter(args.zstd_level)
+
+    # dictionary to train off this run's first pages, if one was asked for but doesn't exist yet
+    train_dict_path: Path | None = None
+    if args.zstd_dict is not None:
+        dict_path = Path(args.zstd_dict)
+        if dict_path.exists():
+            writer.use_dict(pyzstd.ZstdDict(dict_path.read_bytes()))
+            # keep a copy with the job, its files can't be decompressed without it
+            (job_data_path / JOB_DICT_NAME).write_bytes(dict_path.read_bytes())
+        else:
+            train_dict_path = dict_path
+
+    writer.write_json(scrape_meta, job_data_path / "meta.json.zst")
 
-    for page in api.crawl_store(args.region, args.store):
-        write_json_zstd(page.response_data, job_data_path / f'{page.response_time.isoformat()}.json.zst')
+    asyncio.run(crawl_to_disk(
+        args.api_host, args.api_root, args.region, args.store, job_data_path, writer, train_dict_path
+    ))